@@ -6,6 +6,14 @@ YELLOW='\033[0;33m'
 RED='\033[0;31m'
 NC='\033[0m' # No Color
 
+# The spaCy model is only needed for the optional grammar metadata (--use-spacy)
+USE_SPACY=false
+for arg in "$@"; do
+    if [ "$arg" == "--use-spacy" ]; then
+        USE_SPACY=true
+    fi
+done
+
 
 # Download valid Wordle words
 mkdir -p data/raw
@@ -51,18 +59,20 @@ else
 fi
 
 # Download and Install SpaCy Model
-echo -e "${YELLOW}Checking for the spaCy 'en_core_web_sm' model...${NC}"
-if ! python -c "import spacy; spacy.load('en_core_web_sm')" &> /dev/null; then
-    echo -e "${YELLOW}SpaCy model not found. Downloading...${NC}"
-    python -m spacy download en_core_web_sm
-    if [ $? -eq 0 ]; then
-        echo -e "${GREEN}SpaCy model downloaded successfully.${NC}"
+if [ "$USE_SPACY" = true ]; then
+    echo -e "${YELLOW}Checking for the spaCy 'en_core_web_sm' model...${NC}"
+    if ! python -c "import spacy; spacy.load('en_core_web_sm')" &> /dev/null; then
+        echo -e "${YELLOW}SpaCy model not found. Downloading...${NC}"
+        python -m spacy download en_core_web_sm
+        if [ $? -eq 0 ]; then
+            echo -e "${GREEN}SpaCy model downloaded successfully.${NC}"
+        else
+            echo -e "${RED}Failed to download the spaCy model. Please run 'python -m spacy download en_core_web_sm' manually.${NC}"
+            exit 1
+        fi
     else
-        echo -e "${RED}Failed to download the spaCy model. Please run 'python -m spacy download en_core_web_sm' manually.${NC}"
-        exit 1
+        echo -e "${GREEN}SpaCy model already installed.${NC}"
     fi
-else
-    echo -e "${GREEN}SpaCy model already installed.${NC}"
 fi
 
 
@@ -76,19 +86,21 @@ fi
 
 echo -e "${YELLOW}Running the dataset build script...${NC}"
 # Execute the python script to process the raw data
-python data/scripts/build_dataset.py
+python data/scripts/build_dataset.py "$@"
 
 # Check the exit code of the python script
 if [ $? -eq 0 ]; then
     echo -e "${GREEN}Dataset build script completed successfully.${NC}"
     
-    # --- Cleanup: Uninstall SpaCy Model ---
-    echo -e "${YELLOW}Cleaning up by uninstalling the spaCy model...${NC}"
-    python -m pip uninstall -y en-core-web-sm &> /dev/null
-    if [ $? -eq 0 ]; then
-        echo -e "${GREEN}SpaCy model uninstalled successfully.${NC}"
-    else
-        echo -e "${RED}Could not automatically uninstall the spaCy model.${NC}"
+    if [ "$USE_SPACY" = true ]; then
+        # --- Cleanup: Uninstall SpaCy Model ---
+        echo -e "${YELLOW}Cleaning up by uninstalling the spaCy model...${NC}"
+        python -m pip uninstall -y en-core-web-sm &> /dev/null
+        if [ $? -eq 0 ]; then
+            echo -e "${GREEN}SpaCy model uninstalled successfully.${NC}"
+        else
+            echo -e "${RED}Could not automatically uninstall the spaCy model.${NC}"
+        fi
     fi
 else
     echo -e "${RED}Dataset build script failed.${NC}"
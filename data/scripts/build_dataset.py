@@ -1,104 +1,189 @@
-import json
 import sys
 import os
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from pathlib import Path
+
+import ijson
+import numpy as np
+import orjson
 
 from build_test import create_test_data
 from build_train import create_train_data
 
-def calculate_stats(stats_dict):
+# number of puzzles whose stats are computed together while streaming
+CHUNK_SIZE = 2000
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+def iter_chunks(iterable, size):
+    """Yields successive lists of at most `size` items from an iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def calculate_stats(stats_dicts):
     """
-    A helper function to calculate win rate and average steps for a given
-    statistics dictionary (which can be for regular or hard mode).
+    A helper function to calculate win rate and average steps for a batch of
+    statistics dictionaries (which can be for regular or hard mode).
+
+    The 'individual' lists are stacked into one (N, steps) array so the weighted
+    step sums for the whole batch come from a single matrix-vector product.
+    Lists shorter than the longest one in the batch are padded with zeros.
     
     Args:
-        stats_dict (dict): A dictionary containing 'cumulative' and 'individual' lists.
+        stats_dicts (list): Dictionaries containing 'cumulative' and 'individual' lists.
         
     Returns:
-        tuple: A tuple containing the win_rate and average_steps.
+        list: A (win_rate, average_steps) tuple for each dictionary, in order.
     """
     # Default values in case data is missing
-    win_rate = 0
-    average_steps = 0
-    
+    results = [(0, 0)] * len(stats_dicts)
+
     # Ensure the necessary data exists and is not empty
-    if "cumulative" in stats_dict and stats_dict["cumulative"] and \
-       "individual" in stats_dict and stats_dict["individual"]:
-        
-        # Win rate is the last value in the 'cumulative' list.
-        win_rate = stats_dict["cumulative"][-1]
-
-        # gemini doesn't know that this is the same thing as win rate 🫣 
-        # i'll just leave this here... 🤪
-        individual_scores = stats_dict["individual"]
-        total_solvers_percent = sum(individual_scores)
-
-        if total_solvers_percent > 0:
-            # Calculate the weighted sum of steps: 1, 2, 3, 4, 5, and 6
-            weighted_steps_sum = sum(
-                (i + 1) * score for i, score in enumerate(individual_scores)
-            )
-            
-            # the stats.wordle.today site uses the value 6.8 for
-            # the not solved step count. this value isn't listed anywhere, but you
-            # can find it by including an extra x*loss_rate / 100 in the mean calculation.
-            # loss_rate = 1 - win_rate, these aren't percents, so we multiply by 100 below
-            weighted_steps_sum += (100-win_rate) * 6.8
-            average_steps = round(weighted_steps_sum / 100, 4)
-
-    return win_rate, average_steps
+    complete = [i for i, stats in enumerate(stats_dicts) if stats.get("cumulative") and stats.get("individual")]
+
+    if not complete:
+        return results
+
+    # Win rate is the last value in the 'cumulative' list.
+    win_rates = [stats_dicts[i]["cumulative"][-1] for i in complete]
+
+    # there are normally 6 steps, but zero-padding keeps any ragged rows stackable
+    width = max(len(stats_dicts[i]["individual"]) for i in complete)
+    individual_scores = np.zeros((len(complete), width), dtype=np.float64)
+    for row, i in zip(individual_scores, complete):
+        scores = stats_dicts[i]["individual"]
+        row[:len(scores)] = scores
+
+    # gemini doesn't know that this is the same thing as win rate 🫣 
+    # i'll just leave this here... 🤪
+    total_solvers_percent = individual_scores.sum(axis=1)
+
+    # Calculate the weighted sum of steps: 1, 2, 3, 4, 5, and 6
+    weighted_steps_sum = individual_scores @ np.arange(1, width + 1, dtype=np.float64)
+
+    # the stats.wordle.today site uses the value 6.8 for
+    # the not solved step count. this value isn't listed anywhere, but you
+    # can find it by including an extra x*loss_rate / 100 in the mean calculation.
+    # loss_rate = 1 - win_rate, these aren't percents, so we multiply by 100 below
+    weighted_steps_sum += (100 - np.array(win_rates, dtype=np.float64)) * 6.8
+
+    for i, win_rate, steps_sum, solvers in zip(complete, win_rates, weighted_steps_sum.tolist(), total_solvers_percent.tolist()):
+        results[i] = (win_rate, round(steps_sum / 100, 4) if solvers > 0 else 0)
+
+    return results
+
+def add_stats(puzzles):
+    """
+    Adds 'win_rate' and 'average_steps' to a batch of puzzle records, and to
+    their 'hardmode' stats where present. Records are updated in place and
+    also returned, so this can run in a worker process.
+    """
+    for stats, (win_rate, average_steps) in zip(puzzles, calculate_stats(puzzles)):
+        stats["win_rate"], stats["average_steps"] = win_rate, average_steps
+
+    hardmode = [stats["hardmode"] for stats in puzzles if isinstance(stats.get("hardmode"), dict)]
+    for hardmode_stats, (win_rate, average_steps) in zip(hardmode, calculate_stats(hardmode)):
+        hardmode_stats["win_rate"], hardmode_stats["average_steps"] = win_rate, average_steps
+
+    return puzzles
+
+def add_stats_in_parallel(chunks, max_workers):
+    """
+    Runs add_stats on each chunk of (puzzle_id, stats) pairs in a pool of worker
+    processes and yields the enhanced chunks in their original order. At most
+    max_workers chunks are in flight at once, so memory stays bounded while streaming.
+    A single chunk is processed inline instead of starting a pool for it.
+    """
+    chunks = iter(chunks)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return
+    second_chunk = next(chunks, None)
+    if second_chunk is None:
+        add_stats([stats for _, stats in first_chunk])
+        yield first_chunk
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for chunk in chain((first_chunk, second_chunk), chunks):
+            puzzle_ids = [puzzle_id for puzzle_id, _ in chunk]
+            pending.append((puzzle_ids, pool.submit(add_stats, [stats for _, stats in chunk])))
+            if len(pending) >= max_workers:
+                puzzle_ids, future = pending.popleft()
+                yield list(zip(puzzle_ids, future.result()))
+        while pending:
+            puzzle_ids, future = pending.popleft()
+            yield list(zip(puzzle_ids, future.result()))
 
 def main():
     """
     Loads raw Wordle puzzle data, calculates stats, saves the enhanced data,
     and generates categorized test and train data.
     """
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-    PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
-
-    input_filepath = os.path.join(PROJECT_ROOT, "data/raw/historical_stats.json")
-    processed_dir = os.path.join(PROJECT_ROOT, "data/processed")
-    train_dir = os.path.join(PROJECT_ROOT, "data/train")
-    test_dir = os.path.join(PROJECT_ROOT, "data/test")
-    output_filepath = os.path.join(processed_dir, "historical_stats.json")
+    parser = argparse.ArgumentParser(description="Build the Wordle test and train datasets.")
+    parser.add_argument('--use-spacy', action='store_true', help="Tag train candidates with spaCy and save grammar metadata.")
+    args = parser.parse_args()
+
+    PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+    input_filepath = PROJECT_ROOT / "data/raw/historical_stats.json"
+    processed_dir = PROJECT_ROOT / "data/processed"
+    train_dir = PROJECT_ROOT / "data/train"
+    test_dir = PROJECT_ROOT / "data/test"
+    output_filepath = processed_dir / "historical_stats.json"
     
     try:
-        os.makedirs(processed_dir, exist_ok=True)
-        os.makedirs(train_dir, exist_ok=True)
-        os.makedirs(test_dir, exist_ok=True)
+        for directory in (processed_dir, train_dir, test_dir):
+            directory.mkdir(parents=True, exist_ok=True)
         print(f"Ensured output directories exist: {processed_dir}, {train_dir}, {test_dir}")
 
-        print(f"\nLoading raw data from '{input_filepath}'...")
-        with open(input_filepath, 'r') as f:
-            wordle_data = json.load(f)
-        print("Data loaded and parsed successfully.")
-
-        print("\nCalculating win rates and average steps...")
-        for puzzle_id, stats in wordle_data.items():
-            stats["win_rate"], stats["average_steps"] = calculate_stats(stats)
-            if "hardmode" in stats and isinstance(stats["hardmode"], dict):
-                hardmode_stats = stats["hardmode"]
-                hardmode_stats["win_rate"], hardmode_stats["average_steps"] = calculate_stats(hardmode_stats)
-        print("Calculations complete.")
+        # stream puzzles in chunks, computing the stats for whole chunks at once in
+        # worker processes and writing each enhanced record straight back out. only the
+        # answers and their average steps, which the test split needs, are kept in memory
+        print(f"\nStreaming raw data from '{input_filepath}' and calculating win rates and average steps...")
+        answers, average_steps = [], []
+        # records are written to a temporary file that only replaces the output once the whole
+        # input has been parsed, so a bad input can't leave a truncated file behind
+        temp_filepath = output_filepath.with_name(output_filepath.name + ".tmp")
+        try:
+            with open(input_filepath, 'rb') as f_in, open(temp_filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f_out:
+                f_out.write(b"{\n")
+                separator = b""
+                chunks = iter_chunks(ijson.kvitems(f_in, '', use_float=True), CHUNK_SIZE)
+                for chunk in add_stats_in_parallel(chunks, max_workers=os.cpu_count() or 1):
+                    for puzzle_id, stats in chunk:
+                        f_out.write(separator + orjson.dumps(puzzle_id) + b": " + orjson.dumps(stats))
+                        separator = b",\n"
 
-        print(f"\nSaving enhanced data to '{output_filepath}'...")
-        with open(output_filepath, 'w') as f:
-            json.dump(wordle_data, f, indent=4)
-        print("Processed data has been saved.")
+                        if stats.get("answer"):
+                            answers.append(stats["answer"])
+                            average_steps.append(stats["average_steps"])
+                f_out.write(b"\n}\n")
+            os.replace(temp_filepath, output_filepath)
+        except BaseException:
+            temp_filepath.unlink(missing_ok=True)
+            raise
+        print(f"Processed {len(answers)} puzzles and saved enhanced data to '{output_filepath}'.")
 
         # --- Build Test and Train Datasets ---
         print("\nCreating test data...")
-        create_test_data(wordle_data, test_dir, PROJECT_ROOT)
+        test_words = create_test_data(answers, average_steps, test_dir, PROJECT_ROOT)
         print("\nTest data creation process finished.")
         
         print("\nCreating train data...")
-        create_train_data(train_dir, test_dir, PROJECT_ROOT)
+        create_train_data(train_dir, test_dir, PROJECT_ROOT, use_spacy=args.use_spacy, test_words=test_words)
         print("\nTrain data creation process finished.")
 
 
     except FileNotFoundError:
         print(f"Error: Raw data file not found at '{input_filepath}'. Please run the download script first.", file=sys.stderr)
         sys.exit(1)
-    except json.JSONDecodeError as e:
+    except ijson.JSONError as e:
         print(f"Error: Failed to parse '{input_filepath}' as JSON: {e}", file=sys.stderr)
         sys.exit(1)
     except IOError as e:
@@ -1,8 +1,16 @@
-import os
 import sys
-import json
+from pathlib import Path
 
-def create_test_data(wordle_data, test_dir, project_root):
+import numpy as np
+import orjson
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+# difficulty categories and the lower step boundary of each one
+STEP_CATEGORIES = ["1_to_2_steps", "2_to_3_steps", "3_to_4_steps", "4_to_5_steps", "5_or_more_steps"]
+STEP_BOUNDARIES = [1, 2, 3, 4, 5]
+
+def create_test_data(answers, average_steps, test_dir, project_root):
     """
     Categorizes Wordle data based on average steps, ranks the solution words
     by difficulty, and saves them to comma-delimited text files in a 'test'
@@ -10,48 +18,35 @@ def create_test_data(wordle_data, test_dir, project_root):
     that are not in the historical data.
 
     Args:
-        wordle_data (dict): The processed Wordle data.
-        test_dir (str): The path to the directory where test files will be saved.
-        project_root (str): The absolute path to the project's root directory.
+        answers (list): The solution word of each historical puzzle.
+        average_steps (list): The average steps to solve each puzzle, aligned with answers.
+        test_dir (Path): The path to the directory where test files will be saved.
+        project_root (Path): The absolute path to the project's root directory.
+
+    Returns:
+        set: All words in the test set (historical + future), or None if the
+        test directory could not be created.
     """
+    test_dir, project_root = Path(test_dir), Path(project_root)
+
     # --- Step 1: Create the test directory if it doesn't exist ---
     try:
-        if not os.path.exists(test_dir):
-            os.makedirs(test_dir)
-            print(f"Directory '{test_dir}' created.")
+        test_dir.mkdir(parents=True, exist_ok=True)
     except OSError as e:
         print(f"Error: Could not create directory '{test_dir}': {e}", file=sys.stderr)
         return
 
     # --- Step 2: Define categories for the words ---
-    categorized_data = {
-        "1_to_2_steps": [],
-        "2_to_3_steps": [],
-        "3_to_4_steps": [],
-        "4_to_5_steps": [],
-        "5_or_more_steps": [],
-        "invalid": []
-    }
+    categorized_data = {category_name: [] for category_name in STEP_CATEGORIES}
+    categorized_data["invalid"] = []
 
     # --- Step 3: Categorize each word by its difficulty ---
-    for puzzle_id, data in wordle_data.items():
-        solution_word = data.get("answer")
-        avg_steps = data.get("average_steps")
-
-        if solution_word and avg_steps is not None:
-            item = (solution_word, avg_steps)
-            if 1 <= avg_steps < 2:
-                categorized_data["1_to_2_steps"].append(item)
-            elif 2 <= avg_steps < 3:
-                categorized_data["2_to_3_steps"].append(item)
-            elif 3 <= avg_steps < 4:
-                categorized_data["3_to_4_steps"].append(item)
-            elif 4 <= avg_steps < 5:
-                categorized_data["4_to_5_steps"].append(item)
-            elif 5 <= avg_steps:
-                categorized_data["5_or_more_steps"].append(item)
-            else:
-                categorized_data["invalid"].append(item)
+    # np.digitize maps every average to its bucket at once: 0 for < 1 step (invalid),
+    # 1 for [1, 2), ..., 5 for >= 5, matching the order of the category lists below
+    buckets = [categorized_data["invalid"]] + [categorized_data[name] for name in STEP_CATEGORIES]
+    bucket_indices = np.digitize(average_steps, STEP_BOUNDARIES)
+    for item, bucket_index in zip(zip(answers, average_steps), bucket_indices.tolist()):
+        buckets[bucket_index].append(item)
 
     # --- Step 4: Sort, write to .txt files, and prepare summary ---
     summary_stats = {"files": {}}
@@ -60,11 +55,10 @@ def create_test_data(wordle_data, test_dir, project_root):
         if not data_list:
             continue
         data_list.sort(key=lambda x: x[1], reverse=True)
-        filepath = os.path.join(test_dir, f"{category_name}.txt")
+        filepath = test_dir / f"{category_name}.txt"
         try:
-            with open(filepath, 'w') as f:
-                for word, steps in data_list:
-                    f.write(f"{word},{steps}\n")
+            with open(filepath, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write("".join(f"{word},{steps}\n" for word, steps in data_list))
             
             summary_stats["files"][category_name] = {
                 "filename": f"{category_name}.txt",
@@ -77,19 +71,19 @@ def create_test_data(wordle_data, test_dir, project_root):
 
     # --- Step 5: Find and save future words ---
     print("\nFinding future words not in historical data...")
-    solutions_filepath = os.path.join(project_root, "data/raw/all_solutions.txt")
-    future_words_filepath = os.path.join(test_dir, "future_words.txt")
+    solutions_filepath = project_root / "data/raw/all_solutions.txt"
+    future_words_filepath = test_dir / "future_words.txt"
     future_words = []
+    historical_words = {answer.upper() for answer in answers}
+    print(f"Found {len(historical_words)} total historical words.")
     try:
-        historical_words = {data.get("answer").upper() for data in wordle_data.values() if data.get("answer")}
-        print(f"Found {len(historical_words)} total historical words.")
-        with open(solutions_filepath, 'r') as f:
-            all_solutions = {line.strip().upper() for line in f}
-
-        future_words = sorted(list(all_solutions - historical_words))
-        with open(future_words_filepath, 'w') as f:
-            for word in future_words:
-                f.write(f"{word}\n")
+        # uppercase and split the whole file at once, staying in bytes until the diff is done
+        with open(solutions_filepath, 'rb') as f:
+            all_solutions = set(f.read().upper().split())
+
+        future_words = sorted(word.decode() for word in all_solutions - {word.encode() for word in historical_words})
+        with open(future_words_filepath, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write("".join(f"{word}\n" for word in future_words))
         
         print(f"Found {len(future_words)} future words and saved them to '{future_words_filepath}'.")
 
@@ -114,11 +108,13 @@ def create_test_data(wordle_data, test_dir, project_root):
         "test_set_count": total_test_words,
         "files_created": len(summary_stats["files"])
     }
-    summary_filepath = os.path.join(test_dir, "test_data_summary.json")
+    summary_filepath = test_dir / "test_data_summary.json"
     try:
-        with open(summary_filepath, 'w') as f:
-            json.dump(summary_stats, f, indent=4)
+        with open(summary_filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(orjson.dumps(summary_stats, option=orjson.OPT_INDENT_2))
         print(f"\nTest data summary saved to '{summary_filepath}'.")
         print(f"{total_test_words} total words in the test set (Historical + Future)")
     except IOError as e:
-        print(f"Error: Could not write summary file '{summary_filepath}': {e}", file=sys.stderr)
\ No newline at end of file
+        print(f"Error: Could not write summary file '{summary_filepath}': {e}", file=sys.stderr)
+
+    return historical_words | set(future_words)
\ No newline at end of file
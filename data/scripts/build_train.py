@@ -1,19 +1,69 @@
 import os
 import sys
-import spacy
-import inflect
-import json
-from wordfreq import zipf_frequency
+import mmap
+import argparse
+from pathlib import Path
+import orjson
+from math import log10
+from wordfreq import get_frequency_dict
 
-def create_train_data(train_dir, test_dir, project_root, save_rejected_plurals=True):
+WRITE_BUFFER_SIZE = 1 << 20
+
+# 'ss' never ends an 's' plural (cross, glass)
+NON_PLURAL_ENDINGS = ('ss',)
+# -us and -is words are usually singular (sinus, penis) unless the stem is at least
+# as common as the word itself (menus, taxis), see find_singular_form
+AMBIGUOUS_PLURAL_ENDINGS = ('us', 'is')
+# 'es' only forms a plural after these endings (foxes, buses, churches, heroes)
+ES_PLURAL_STEM_ENDINGS = ('s', 'x', 'z', 'ch', 'sh', 'o')
+# common words whose stem is an unrelated word or that are irregular plurals, which Wordle allows
+NOT_PLURALS = {'yours', 'corps', 'lives'}
+# the singular has to be a real word rather than a rare fragment (zipf >= 2) ...
+SINGULAR_ZIPF_FLOOR = 2.0
+# ... and the plural can't be more than ~300x rarer than it (evens, heres)
+MAX_PLURAL_ZIPF_GAP = 2.5
+
+def zipf_from_frequency(freq):
+    """Converts a wordfreq frequency to the Zipf scale, log10 of the frequency per billion words."""
+    return log10(freq) + 9
+
+def find_singular_form(word, known_words):
+    """
+    Returns the singular that a lowercase word is a regular 's' or 'es' plural of,
+    or None if it isn't one. known_words maps words to their wordfreq frequency.
+    """
+    if word.endswith(NON_PLURAL_ENDINGS) or word in NOT_PLURALS:
+        return None
+
+    candidates = []
+    if word.endswith('s'):
+        candidates.append(word[:-1])
+    if word.endswith('es') and word[:-2].endswith(ES_PLURAL_STEM_ENDINGS):
+        candidates.append(word[:-2])
+
+    word_zipf = zipf_from_frequency(known_words[word]) if word in known_words else 0.0
+    for singular in candidates:
+        if singular not in known_words:
+            continue
+        singular_zipf = zipf_from_frequency(known_words[singular])
+        if singular_zipf < SINGULAR_ZIPF_FLOOR or singular_zipf - word_zipf > MAX_PLURAL_ZIPF_GAP:
+            continue
+        # a false stem like basi (basis) or jesu (jesus) is much rarer than the word
+        if word.endswith(AMBIGUOUS_PLURAL_ENDINGS) and singular_zipf < word_zipf:
+            continue
+        return singular
+    return None
+
+def create_train_data(train_dir, test_dir, project_root, save_rejected_plurals=True, use_spacy=False, test_words=None):
     """
     Builds a high-quality training dataset by filtering a master list of words.
 
     The process is as follows:
-    1.  Load all words from the test set for exclusion.
+    1.  Load all words from the test set for exclusion (unless already given).
     2.  Load a master list of valid words.
-    3.  For words identified as NOUNS, exclude those that are regular plurals 
-        ending in 's' or 'es'. If enabled, save these and additional metadata.
+    3.  Exclude regular plurals ending in 's' or 'es', i.e. words that become a
+        common English word once the suffix is removed (see find_singular_form).
+        If enabled, save these and additional grammar metadata.
     4.  Calculate the Zipf frequency for each remaining word and filter out
         very obscure words that fall below a frequency threshold.
     5.  Save the final list of words and their frequencies to 'train.txt',
@@ -21,108 +71,127 @@ def create_train_data(train_dir, test_dir, project_root, save_rejected_plurals=T
     6.  Generate a JSON summary of the entire process.
     
     Args:
-        train_dir (str): Path to the directory where training files will be saved.
-        test_dir (str): Path to the directory where test files are stored.
-        project_root (str): The absolute path to the project's root directory.
-        save_rejected_plurals (bool): If True, saves a list of excluded plural nouns.
+        train_dir (Path): Path to the directory where training files will be saved.
+        test_dir (Path): Path to the directory where test files are stored.
+        project_root (Path): The absolute path to the project's root directory.
+        save_rejected_plurals (bool): If True, saves a list of excluded plurals.
+        use_spacy (bool): If True, tags candidates with spaCy to fill in the 'pos' of their grammar metadata.
+        test_words (set): Uppercase test set words, e.g. as returned by create_test_data.
+            If None, they are read back from the files in test_dir.
     """
+    train_dir, test_dir, project_root = Path(train_dir), Path(test_dir), Path(project_root)
     print("Starting training data creation...")
 
 
     # --- Step 1: Read test set words for exclusion ---
-    test_words = set()
-    try:
-        for filename in os.listdir(test_dir):
-            if filename.endswith(".txt"):
-                filepath = os.path.join(test_dir, filename)
-                with open(filepath, 'r') as f:
-                    for line in f:
-                        test_words.add(line.strip().split(',')[0].upper())
-        print(f"Loaded {len(test_words)} words from the test set to exclude.")
-    except Exception as e:
-        print(f"An error occurred while reading test files: {e}", file=sys.stderr)
-        return
+    if test_words is None:
+        test_words = set()
+        try:
+            for entry in os.scandir(test_dir):
+                if entry.name.endswith(".txt"):
+                    with open(entry.path, 'rb') as f:
+                        data = f.read()
+                    # the word is everything before the first comma (future_words.txt has no comma)
+                    test_words.update(
+                        line.partition(b',')[0].strip().upper().decode() for line in data.splitlines() if line
+                    )
+            print(f"Loaded {len(test_words)} words from the test set to exclude.")
+        except Exception as e:
+            print(f"An error occurred while reading test files: {e}", file=sys.stderr)
+            return
+    else:
+        print(f"Using {len(test_words)} words from the test set to exclude.")
 
     # --- Step 2: Read the master list of valid words ---
-    valid_words_path = os.path.join(project_root, "data/raw/valid-words.txt")
+    valid_words_path = project_root / "data/raw/valid-words.txt"
     try:
-        with open(valid_words_path, 'r') as f:
-            valid_words = {line.strip().upper() for line in f if line.strip()}
+        with open(valid_words_path, 'rb') as f:
+            # mmap can't map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                print(f"Error: Valid words file at '{valid_words_path}' is empty.", file=sys.stderr)
+                return
+            # map the file and uppercase/split the whole buffer at once instead of line by line
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                valid_words = set(mm[:].upper().decode().split())
         print(f"Loaded {len(valid_words)} words from the master valid words list.")
     except FileNotFoundError:
         print(f"Error: Valid words file not found at '{valid_words_path}'.", file=sys.stderr)
         return
+    except UnicodeDecodeError as e:
+        print(f"Error: Valid words file at '{valid_words_path}' is not valid UTF-8: {e}", file=sys.stderr)
+        return
 
-    # --- Step 3: Filter candidates, applying precise plural rule only to nouns ---
-    initial_candidates = sorted(list(valid_words - test_words)) # remove test set from list of valid words
+    # --- Step 3: Filter candidates, removing regular plurals ending in 's' or 'es' ---
+    initial_candidates = list(valid_words - test_words) # remove test set from list of valid words (order doesn't matter here)
     print(f"Found {len(initial_candidates)} candidate words before filtering.")
 
-    print("\nLoading spaCy model and filtering words... (This may take a moment)")
-    try:
-        nlp = spacy.load("en_core_web_sm", disable=["ner", "parser"])
-    except OSError:
-        print("\n--- SpaCy Model Not Found ---", file=sys.stderr)
-        print("The 'en_core_web_sm' model is missing.", file=sys.stderr)
-        print("Please download it by running: python -m spacy download en_core_web_sm", file=sys.stderr)
-        sys.exit(1)
-
-    p = inflect.engine()
+    # the valid words list only holds 5-letter words, so the wordfreq vocabulary
+    # serves as the singular lexicon (see find_singular_form)
+    known_words = get_frequency_dict("en", "best")
     filtered_candidates = []
     rejected_plurals = []
-    
     grammar_metadata = {}
 
-    for doc in nlp.pipe(initial_candidates, batch_size=1000):
-        # doc: <class 'spacy.tokens.doc.Doc'>
-        tok = doc[0] # tok: <class 'spacy.tokens.token.Token'>
+    for word in initial_candidates:
+        singular_form = find_singular_form(word.lower(), known_words)
 
-        word_text_lower = tok.text.lower()
-        is_banned_plural = False
-
-        singular_form = None
-        if tok.pos_ == "NOUN" or tok.pos_ == "PROPN":
-            singular_form = p.singular_noun(word_text_lower)
-            if singular_form:
-                if (singular_form + 's') == word_text_lower or \
-                   (singular_form + 'es') == word_text_lower:
-                    is_banned_plural = True
-        
-        # could optionally remove proper nouns here
-        if not is_banned_plural:
-            filtered_candidates.append(tok.text)
+        if singular_form is None:
+            filtered_candidates.append(word)
         else:
-            rejected_plurals.append(tok.text)
+            rejected_plurals.append(word)
 
-        grammar_metadata[tok.text] = {
-            "pos": tok.pos_,
+        # pos is filled in below when tagging with spaCy
+        grammar_metadata[word] = {
+            "pos": None,
             "singular_form": singular_form,
-            "is_banned_plural": is_banned_plural
+            "is_banned_plural": singular_form is not None
         }
 
     plural_removed_count = len(rejected_plurals)
-    print(f"Retained {len(filtered_candidates)} words after removing {plural_removed_count} plural nouns.")
+    print(f"Retained {len(filtered_candidates)} words after removing {plural_removed_count} plurals.")
+
+    # spaCy is only needed for the part-of-speech info in the grammar metadata
+    if use_spacy:
+        print("\nLoading spaCy model and tagging words... (This may take a moment)")
+        try:
+            import spacy
+            # only the tagger and the attribute ruler (which maps tags to pos_) are needed
+            nlp = spacy.load("en_core_web_sm", disable=["ner", "parser", "lemmatizer"])
+        except ImportError:
+            print("\n[ERROR] spaCy is not installed. To tag words, run: 'uv sync --extra dataset'", file=sys.stderr)
+            sys.exit(1)
+        except OSError:
+            print("\n--- SpaCy Model Not Found ---", file=sys.stderr)
+            print("The 'en_core_web_sm' model is missing.", file=sys.stderr)
+            print("Please download it by running: python -m spacy download en_core_web_sm", file=sys.stderr)
+            sys.exit(1)
+
+        n_process = max(1, (os.cpu_count() or 1) - 1)
+        for doc in nlp.pipe(initial_candidates, batch_size=4096, n_process=n_process):
+            # doc: <class 'spacy.tokens.doc.Doc'>
+            tok = doc[0] # tok: <class 'spacy.tokens.token.Token'>
+            grammar_metadata[tok.text]["pos"] = tok.pos_
 
     # --- Step 4: Save rejected plurals and grammar info (if enabled) ---
     if save_rejected_plurals and rejected_plurals:
-        processed_dir = os.path.join(project_root, "data/processed")
-        rejected_filepath = os.path.join(processed_dir, "rejected_plurals.txt")
-        grammar_filepath = os.path.join(processed_dir, "grammar_metadata.json")
+        processed_dir = project_root / "data/processed"
+        rejected_filepath = processed_dir / "rejected_plurals.txt"
+        grammar_filepath = processed_dir / "grammar_metadata.json"
         
         rejected_plurals.sort()
 
-        # sort the grammar data by pos
-        grammar_metadata = dict(
-            sorted(grammar_metadata.items(), key=lambda item: item[1]['pos'])
-        )
-
         try:
-            with open(rejected_filepath, 'w') as f:
-                for word in rejected_plurals:
-                    f.write(f"{word}\n")
-            print(f"Saved {len(rejected_plurals)} rejected plural nouns to '{rejected_filepath}'.")
+            with open(rejected_filepath, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write("".join(f"{word}\n" for word in rejected_plurals))
+            print(f"Saved {len(rejected_plurals)} rejected plurals to '{rejected_filepath}'.")
 
-            with open(grammar_filepath, "w") as f:
-                json.dump(grammar_metadata, f, indent=4)
+            # sort the grammar data by pos (if tagged), then alphabetically
+            grammar_metadata = dict(
+                sorted(grammar_metadata.items(), key=lambda item: (item[1]['pos'] or "", item[0]))
+            )
+            # consumed by code rather than read by people, so it's written without indentation
+            with open(grammar_filepath, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(orjson.dumps(grammar_metadata))
             print(f"Saved grammar info for each word to '{grammar_filepath}'.")
 
         except IOError as e:
@@ -132,24 +201,28 @@ def create_train_data(train_dir, test_dir, project_root, save_rejected_plurals=T
     ZIPF_FREQUENCY_THRESHOLD = 2.5
     print(f"\nFiltering words with Zipf frequency < {ZIPF_FREQUENCY_THRESHOLD}...")
 
+    # look frequencies up in the dictionary loaded for the plural check rather than
+    # going through zipf_frequency() per word
     final_word_list_with_freq = []
     for word in filtered_candidates:
-        freq = zipf_frequency(word.lower(), "en")
-        if freq >= ZIPF_FREQUENCY_THRESHOLD:
-            final_word_list_with_freq.append((word, freq))
+        word_freq = known_words.get(word.lower(), 0.0)
+        if word_freq > 0:
+            freq = round(zipf_from_frequency(word_freq), 2)
+            if freq >= ZIPF_FREQUENCY_THRESHOLD:
+                final_word_list_with_freq.append((word, freq))
 
     print(f"Retained {len(final_word_list_with_freq)} words after frequency filter.")
 
     # --- Step 6: Sort by frequency and save the final training set ---
     print("\nSorting by frequency and saving the final training set...")
     
-    final_word_list_with_freq.sort(key=lambda x: x[1], reverse=True)
+    # ties are broken alphabetically since the candidates come from an unordered set
+    final_word_list_with_freq.sort(key=lambda x: (-x[1], x[0]))
 
-    output_filepath = os.path.join(train_dir, "train.txt")
+    output_filepath = train_dir / "train.txt"
     try:
-        with open(output_filepath, 'w') as f:
-            for word, freq in final_word_list_with_freq:
-                f.write(f"{word},{freq:.2f}\n")
+        with open(output_filepath, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write("".join(f"{word},{freq:.2f}\n" for word, freq in final_word_list_with_freq))
         print(f"Saved {len(final_word_list_with_freq)} words with frequencies to '{output_filepath}'.")
     except IOError as e:
         print(f"Error writing to '{output_filepath}': {e}", file=sys.stderr)
@@ -189,21 +262,24 @@ def create_train_data(train_dir, test_dir, project_root, save_rejected_plurals=T
             "entry_count": len(rejected_plurals)
         })
     
-    summary_filepath = os.path.join(train_dir, "train_data_summary.json")
+    summary_filepath = train_dir / "train_data_summary.json"
     try:
-        with open(summary_filepath, 'w') as f:
-            json.dump(summary_stats, f, indent=4)
+        with open(summary_filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(orjson.dumps(summary_stats, option=orjson.OPT_INDENT_2))
         print(f"\nTraining data summary saved to '{summary_filepath}'.")
     except IOError as e:
         print(f"Error writing summary file '{summary_filepath}': {e}", file=sys.stderr)
 
 if __name__ == "__main__":
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-    PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
-    train_dir = os.path.join(PROJECT_ROOT, "data/train")
-    test_dir = os.path.join(PROJECT_ROOT, "data/test")
+    parser = argparse.ArgumentParser(description="Build the Wordle training set.")
+    parser.add_argument('--use-spacy', action='store_true', help="Tag candidates with spaCy to add their part of speech to the grammar metadata.")
+    args = parser.parse_args()
+
+    PROJECT_ROOT = Path(__file__).resolve().parents[2]
+    train_dir = PROJECT_ROOT / "data/train"
+    test_dir = PROJECT_ROOT / "data/test"
     
-    os.makedirs(train_dir, exist_ok=True)
-    os.makedirs(test_dir, exist_ok=True)
+    train_dir.mkdir(parents=True, exist_ok=True)
+    test_dir.mkdir(parents=True, exist_ok=True)
     
-    create_train_data(train_dir, test_dir, PROJECT_ROOT, save_rejected_plurals=True)
\ No newline at end of file
+    create_train_data(train_dir, test_dir, PROJECT_ROOT, save_rejected_plurals=True, use_spacy=args.use_spacy)
\ No newline at end of file
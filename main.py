@@ -1,17 +1,22 @@
 import re
 import os
-import json
 import base64
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple, Any
 from enum import Enum
 
-from wordle import WordleEnv
+from wordle import WordleEnv, dumps_game_state
+import orjson
 from dotenv import load_dotenv
 from litellm import completion, get_supported_openai_params
 
 load_dotenv()
 
+# a guess is a 5-letter word in square brackets, e.g. [CRANE]
+GUESS_PATTERN = re.compile(r'\[([A-Za-z]{5})\]')
+
+WRITE_BUFFER_SIZE = 1 << 20
+
 class ReasoningEffort(Enum):
     DISABLE = "disable"
     LOW     = "low"
@@ -20,6 +25,13 @@ class ReasoningEffort(Enum):
 
 def colored(st, color:Optional[str], background=False): return f"\u001b[{10*background+60*(color.upper() == color)+30+['black', 'red', 'green', 'yellow', 'blue', 'magenta', 'cyan', 'white'].index(color.lower())}m{st}\u001b[0m" if color is not None else st
 
+def image_url_for(obs: Dict[str, Any]) -> Dict[str, str]:
+    """Returns the observation's image as a base64 data URL, encoding it at most once per observation."""
+    if '_image_url' not in obs:
+        base64_image = base64.b64encode(memoryview(obs['image'])).decode('ascii')
+        obs['_image_url'] = {"url": f"data:image/png;base64,{base64_image}"}
+    return obs['_image_url']
+
 def query(
     model: str,
     reasoning_effort: Optional[ReasoningEffort],
@@ -62,7 +74,7 @@ def play_wordle(model: str, reasoning_effort: ReasoningEffort, render_mode: str,
     Args:
         model (str): The identifier of the model to use.
         reasoning_effort (ReasoningEffort): The reasoning effort setting for the model.
-        render_mode (str): 'text' or 'image'.
+        render_mode (str): 'text', 'image' or 'image_html'.
         target_word (str): The secret word for the game.
         logging_enabled (bool): If True, saves all game artifacts to disk.
     """
@@ -76,6 +88,7 @@ def play_wordle(model: str, reasoning_effort: ReasoningEffort, render_mode: str,
 
     # 1. Initialize environment and logging paths
     env = WordleEnv(render_mode=render_mode, target_word=target_word, model_name=model)
+    image_mode = render_mode in ('image', 'image_html')
     obs = env.reset()
 
     game_log_dir: Optional[Path] = None
@@ -83,89 +96,91 @@ def play_wordle(model: str, reasoning_effort: ReasoningEffort, render_mode: str,
     if logging_enabled:
         model_dir_name = model.replace('/', '_') # Sanitize model name
         game_log_dir = Path("logs") / model_dir_name / env.game_id
-        if render_mode == 'image':
+        if image_mode:
             screenshot_dir = game_log_dir / "screenshots"
             os.makedirs(screenshot_dir, exist_ok=True)
         else:
             os.makedirs(game_log_dir, exist_ok=True)
         print(colored(f"Logs for this game will be saved to: {game_log_dir}", "blue"))
 
-    # 2. Prepare initial prompts
-    system_prompt_text = (
-        "You are an expert Wordle player. Your objective is to guess a 5-letter secret word in 6 tries. "
-        "I will provide the current game state via text and an image of the board after each of your guesses. "
-        "Your response MUST be a single, valid 5-letter English word enclosed in square brackets, like [WORD]."
-    )
-    system_prompt = {"role": "system", "content": system_prompt_text}
-
-    messages_for_logging = [system_prompt]
-    messages_for_llm = [system_prompt]
-
-    observation_text = obs.get('text', 'The board is empty.')
-    print(observation_text)
+    # a single message history is sent to the llm and logged. the multimodal conversation is
+    # streamed to disk as JSON Lines, one message per line, so the log doesn't have to be
+    # serialized in one go at the end of the game
+    messages: List[Dict[str, Any]] = []
+    conversation_log = open(game_log_dir / "conversation.jsonl", 'wb', buffering=WRITE_BUFFER_SIZE) if game_log_dir else None
+    def add_message(message: Dict[str, Any]):
+        messages.append(message)
+        if conversation_log:
+            conversation_log.write(orjson.dumps(message) + b"\n")
+
+    # the log is closed even if the game is cut short (missing image, network error, ctrl-c)
+    # so the buffered messages are flushed to disk
+    try:
+        # 2. Prepare initial prompts
+        system_prompt_text = (
+            "You are an expert Wordle player. Your objective is to guess a 5-letter secret word in 6 tries. "
+            "I will provide the current game state via text and an image of the board after each of your guesses. "
+            "Your response MUST be a single, valid 5-letter English word enclosed in square brackets, like [WORD]."
+        )
+        system_prompt = {"role": "system", "content": system_prompt_text}
+
+        add_message(system_prompt)
+
+        observation_text = obs.get('text', 'The board is empty.')
+        print(observation_text)
 
-    # --- Initial Turn ---
-    log_content: List[Dict[str, Any]] = [{"type": "text", "text": f"Here is the initial state:\n{observation_text}\n\nWhat is your first guess?"}]
-    llm_content: List[Dict[str, Any]]
+        # --- Initial Turn ---
+        content: List[Dict[str, Any]] = [{"type": "text", "text": f"Here is the initial state:\n{observation_text}\n\nWhat is your first guess?"}]
     
-    if render_mode == 'image':
-        if not obs.get('image'): raise ValueError("Image mode enabled, but no initial image was generated.")
-        base64_image = base64.b64encode(obs['image']).decode('utf-8')
-        image_url = {"url": f"data:image/png;base64,{base64_image}"}
-        # The log content should retain the full base64 image data for complete logging
-        log_content.append({"type": "image_url", "image_url": image_url})
-        llm_content = log_content
-    else:
-        llm_content = log_content
+        if image_mode:
+            if not obs.get('image'): raise ValueError("Image mode enabled, but no initial image was generated.")
+            # The content should retain the full base64 image data for complete logging
+            content.append({"type": "image_url", "image_url": image_url_for(obs)})
 
-    messages_for_logging.append({"role": "user", "content": log_content})
-    messages_for_llm.append({"role": "user", "content": llm_content})
+        add_message({"role": "user", "content": content})
 
-    # 3. Game loop
-    while env.game and not env.game.is_over:
+        # 3. Game loop
+        # the supported params only depend on the model, so look them up once per game
         supported_params = get_supported_openai_params(model=model)
         current_reasoning_effort = reasoning_effort if "reasoning_effort" in supported_params else None
+        max_turns = env.game.MAX_TURNS
 
-        answer, thoughts, _ = query(model, current_reasoning_effort, messages_for_llm)
+        while env.game and not env.game.is_over:
+            answer, thoughts, _ = query(model, current_reasoning_effort, messages)
 
-        match = re.search(r'\[([A-Z]{5})\]', answer.upper())
-        guess = match.group(1) if match else "RAISE"
-        if not match: print(colored(f"LLM returned an invalid response: '{answer}'. Defaulting to 'RAISE'.", "red"))
+            match = GUESS_PATTERN.search(answer)
+            guess = match.group(1).upper() if match else "RAISE"
+            if not match: print(colored(f"LLM returned an invalid response: '{answer}'. Defaulting to 'RAISE'.", "red"))
 
-        if thoughts: print(colored("\n[chain-of-thought]", "yellow"), f"\n{thoughts}")
+            if thoughts: print(colored("\n[chain-of-thought]", "yellow"), f"\n{thoughts}")
 
-        print(f"\n{colored(f'LLM Guess ({env.game.turn + 1}/{env.game.MAX_TURNS}):', 'cyan')} {colored(guess, 'yellow')}")
-        print(30*"-", "\n")
+            print(f"\n{colored(f'LLM Guess ({env.game.turn + 1}/{max_turns}):', 'cyan')} {colored(guess, 'yellow')}")
+            print(30*"-", "\n")
 
-        assistant_response = {"role": "assistant", "content": f"[{guess}]"}
-        messages_for_logging.append(assistant_response)
-        messages_for_llm.append(assistant_response)
+            add_message({"role": "assistant", "content": f"[{guess}]"})
         
-        screenshot_path_for_turn: Optional[Path] = None
-        if logging_enabled and screenshot_dir and render_mode == 'image':
-            turn_num = env.game.turn + 1
-            screenshot_path_for_turn = screenshot_dir / f"turn_{turn_num}.png"
+            screenshot_path_for_turn: Optional[Path] = None
+            if logging_enabled and screenshot_dir and image_mode:
+                turn_num = env.game.turn + 1
+                screenshot_path_for_turn = screenshot_dir / f"turn_{turn_num}.png"
 
-        obs, done = env.step(guess, screenshot_save_path=screenshot_path_for_turn)
+            obs, done = env.step(guess, screenshot_save_path=screenshot_path_for_turn)
         
-        observation_text = obs.get('text', '')
-        print(observation_text)
+            observation_text = obs.get('text', '')
+            print(observation_text)
 
-        if done: break
+            if done: break
 
-        # --- Subsequent Turns ---
-        log_content = [{"type": "text", "text": f"Here is the current state:\n{observation_text}\n\nWhat is your next guess?"}]
-        if render_mode == 'image':
-            if not obs.get('image'): raise ValueError("Image mode enabled, but no image was generated on this step.")
-            base64_image = base64.b64encode(obs['image']).decode('utf-8')
-            image_url = {"url": f"data:image/png;base64,{base64_image}"}
-            log_content.append({"type": "image_url", "image_url": image_url})
-            llm_content = log_content
-        else:
-            llm_content = log_content
+            # --- Subsequent Turns ---
+            content = [{"type": "text", "text": f"Here is the current state:\n{observation_text}\n\nWhat is your next guess?"}]
+            if image_mode:
+                if not obs.get('image'): raise ValueError("Image mode enabled, but no image was generated on this step.")
+                content.append({"type": "image_url", "image_url": image_url_for(obs)})
 
-        messages_for_logging.append({"role": "user", "content": log_content})
-        messages_for_llm.append({"role": "user", "content": llm_content})
+            add_message({"role": "user", "content": content})
+    finally:
+        if conversation_log:
+            conversation_log.close()
 
     # 4. Final result
     print(colored("=" * 30, "blue"))
@@ -182,21 +197,16 @@ def play_wordle(model: str, reasoning_effort: ReasoningEffort, render_mode: str,
         # Save the structured game state, which is the primary artifact
         game_state_filepath = game_log_dir / "game_state.json"
         try:
-            with open(game_state_filepath, 'w') as f:
-                json.dump(env.game_state, f, indent=4)
+            with open(game_state_filepath, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(dumps_game_state(env.game_state))
             print(colored(f"Game state log saved to: {game_state_filepath}", "green"))
         except Exception as e:
             print(colored(f"Error saving game state file: {e}", "red"))
 
-        # Save the full multimodal conversation log, mainly for debugging purposes
-        log_filepath = game_log_dir / "conversation.json"
-        try:
-            # messages_for_logging contains the full history with base64 data and is JSON serializable
-            with open(log_filepath, 'w') as f:
-                json.dump(messages_for_logging, f, indent=4)
-            print(colored(f"Conversation log saved to: {log_filepath}", "green"))
-        except Exception as e:
-            print(colored(f"Error saving conversation log: {e}", "red"))
+        # The full multimodal conversation log (with base64 data) has been written turn by turn,
+        # mainly for debugging purposes
+        if conversation_log:
+            print(colored(f"Conversation log saved to: {conversation_log.name}", "green"))
             
     print(colored("=" * 30, "blue"))
 
@@ -1,5 +1,5 @@
 from .game import WordleGame
-from .env import WordleEnv
+from .env import WordleEnv, dumps_game_state
 from .render import TextUI
 
-__all__ = ["WordleGame", "WordleEnv", "TextUI"]
\ No newline at end of file
+__all__ = ["WordleGame", "WordleEnv", "TextUI", "dumps_game_state"]
\ No newline at end of file
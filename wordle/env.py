@@ -1,16 +1,59 @@
 import argparse
-import json
+import functools
 import os
 import random
 import uuid
 from pathlib import Path
-from typing import Set, Optional, Tuple, Dict, Any
+from typing import FrozenSet, Optional, Tuple, Dict, Any
 
-from .game import WordleGame
-from .render import TextUI, render_wordle_screenshot
+import orjson
+
+from .game import STATE_NAME, WordleGame
+from .render import TextUI, render_wordle_screenshot, render_wordle_screenshot_html
 
 DEFAULT_WORD_LIST_PATH = Path(__file__).parent.parent / 'data' / 'raw' / 'valid-words.txt'
 
+@functools.lru_cache(maxsize=8)
+def _load_word_list_cached(path_str: str, mtime: float) -> FrozenSet[str]:
+    """
+    Parses a word list into a frozenset of uppercase 5-letter words. Cached by
+    (path, mtime) so repeated env construction doesn't re-read an unchanged file.
+    """
+    # uppercase the whole file at once and let split() handle the newlines
+    raw = Path(path_str).read_text().upper()
+    return frozenset(word for word in raw.split() if len(word) == 5)
+
+def dumps_game_state(game_state: Dict[str, Any]) -> bytes:
+    """Serializes an env's game_state to indented JSON (the rollout's int turn keys become strings)."""
+    return orjson.dumps(game_state, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+class _LazyText:
+    """
+    A text observation that is only rendered when it's first turned into a string.
+    Used for obs['text'] in the image modes, where the model is shown the image and
+    the text may never be read, so a rollout doesn't pay for rendering it on every step.
+    """
+    def __init__(self, ui: TextUI, game: WordleGame, status: Optional[str] = None):
+        self.ui = ui
+        self.game = game
+        self.status = status
+        self.turn = game.turn
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            game = self.game
+            if game.turn != self.turn:
+                # the game has moved on since this observation, so replay it up to that point
+                game = WordleGame(self.game.target_word, self.game.valid_words)
+                for word in self.game.guesses[:self.turn]:
+                    game.guess(word)
+            self._text = self.ui.get_text_observation(game, status=self.status)
+            self.ui = self.game = None
+        return self._text
+
+    __repr__ = __str__
+
 class WordleEnv:
     """A Wordle game environment."""
 
@@ -19,21 +62,25 @@ class WordleEnv:
         Initializes the Wordle environment.
 
         Args:
-            render_mode (str): 'text' or 'image'. Determines the observation type.
+            render_mode (str): 'text', 'image' or 'image_html'. Determines the observation type.
+                'image' draws the board with Pillow, 'image_html' screenshots the HTML page
+                with html2image instead.
             word_list_path (Path): Path to the word list file.
             target_word (str): A specific word to use for the game.
             randomize (bool): If True, a random word is chosen.
             model_name (str): The name of the model interacting with the environment.
         """
         # render_mode determines what modality is sent to llm for processing
-        if render_mode not in ['text', 'image']:
-            raise ValueError("render_mode must be 'text' or 'image'")
+        if render_mode not in ['text', 'image', 'image_html']:
+            raise ValueError("render_mode must be 'text', 'image' or 'image_html'")
         self.render_mode = render_mode
         
         self.word_list_path = word_list_path or DEFAULT_WORD_LIST_PATH
-        self.valid_words = self._load_word_list(self.word_list_path)
+        self.valid_words: FrozenSet[str] = self._load_word_list(self.word_list_path)
         if not self.valid_words:
             raise ValueError("Word list is empty or could not be loaded.")
+        # fixed sequence to sample targets from, so reset() doesn't rebuild a list every episode
+        self._valid_words_seq = tuple(self.valid_words)
 
         self.target_word_arg = target_word.upper() if target_word else None
         self.randomize = randomize
@@ -48,17 +95,16 @@ class WordleEnv:
         self.game_state: Dict[str, Any] = {}
         self.last_status: Optional[str] = None
 
-    def _load_word_list(self, path: Path) -> Set[str]:
+    def _load_word_list(self, path: Path) -> FrozenSet[str]:
         if not path.is_file():
             raise FileNotFoundError(f"Error: Word list not found at '{path}'")
-        with open(path, 'r') as f:
-            return {line.strip().upper() for line in f if len(line.strip()) == 5}
+        return _load_word_list_cached(str(path), path.stat().st_mtime)
 
     def reset(self) -> Dict[str, Any]:
         """
         Resets the environment for a new game and returns the initial observation.
         """
-        target = self.target_word_arg or (random.choice(list(self.valid_words)) if self.randomize else next(iter(self.valid_words)))
+        target = self.target_word_arg or (random.choice(self._valid_words_seq) if self.randomize else self._valid_words_seq[0])
         self.game = WordleGame(target, self.valid_words)
         self.game_id = str(uuid.uuid4())
         self.last_status = None
@@ -87,15 +133,14 @@ class WordleEnv:
         if not self.game:
             raise RuntimeError("You must call reset() before calling step().")
         
-        # create new turn entry in rollout
-        turn_str = str(self.game.turn + 1)
-        if turn_str not in self.game_state['rollout']:
-            self.game_state['rollout'][turn_str] = {"steps": []}
+        # create new turn entry in rollout. turns are int keys, they only become strings when dumped to JSON
+        turn_entry = self.game_state['rollout'].setdefault(self.game.turn + 1, {"steps": []})
         
         # reset status for next turn
         self.last_status = None 
         
         # the state of the game before applying the action (guess)
+        # (always a real string, so game_state stays plain JSON-serializable data)
         previous_obs = self.ui.get_text_observation(self.game, status=self.last_status)
 
         # update the state of the game with the guess
@@ -107,9 +152,10 @@ class WordleEnv:
             "input": previous_obs,
             "output": None,
             "guess": guess.upper(),
-            "feedback": status if feedback is None else feedback
+            # logged as state names so the rollout format doesn't depend on the internal codes
+            "feedback": status if feedback is None else [STATE_NAME[code] for code in feedback]
         }
-        self.game_state['rollout'][turn_str]["steps"].append(rollout_entry)
+        turn_entry["steps"].append(rollout_entry)
 
         if "Invalid" in status:
             self.last_status = status 
@@ -127,6 +173,15 @@ class WordleEnv:
             
         return observation, self.game.is_over
 
+    def _get_text_observation(self, status: Optional[str] = None):
+        """
+        Returns the text observation, rendered right away in text mode and on
+        first use otherwise (see _LazyText).
+        """
+        if self.render_mode == 'text':
+            return self.ui.get_text_observation(self.game, status=status)
+        return _LazyText(self.ui, self.game, status)
+
     def _get_observation(
         self,
         status: Optional[str] = None,
@@ -136,18 +191,27 @@ class WordleEnv:
         """
         Generates the observation dictionary. Always returns a text observation
         for the purpose of logging, and optionally returns an image when 
-        render_mode is 'image'.
+        render_mode is 'image' or 'image_html'.
+
+        In the image modes obs['text'] is a _LazyText rather than a str: it renders
+        when converted with str() (print, f-strings, ...), so call str() on it before
+        using string methods or serializing it.
         """
         if not self.game: return {}
 
-        return {
-            'text': self.ui.get_text_observation(self.game, status=status),
-            'image': render_wordle_screenshot(
+        image = None
+        if self.render_mode != 'text':
+            render = render_wordle_screenshot_html if self.render_mode == 'image_html' else render_wordle_screenshot
+            image = render(
                 game=self.game,
                 status=status,
                 invalid_guess=guess if (status and "Invalid" in status) else None,
                 output_path=output_path_for_screenshot
-            ) if self.render_mode == 'image' else None
+            )
+
+        return {
+            'text': self._get_text_observation(status=status),
+            'image': image
         }
 
 def main():
@@ -156,7 +220,7 @@ def main():
         description="Interactive CLI to test the WordleEnv.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    parser.add_argument('--render-mode', type=str, default='human', help="Observation mode: 'text', 'image', or 'human' for interactive play.")
+    parser.add_argument('--render-mode', type=str, default='human', help="Observation mode: 'text', 'image', 'image_html', or 'human' for interactive play.")
     args = parser.parse_args()
 
     try:
@@ -177,7 +241,7 @@ def main():
         if env.game.is_over:
             env.ui.print_game_over(env.game, env.model_name)
             print("\n--- Final Game State ---")
-            print(json.dumps(env.game_state, indent=4))
+            print(dumps_game_state(env.game_state).decode())
             print("------------------------\n")
             break
         
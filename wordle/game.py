@@ -1,11 +1,24 @@
 from collections import Counter
-from typing import List, Dict, Set, Tuple, Optional
+from typing import AbstractSet, FrozenSet, List, Dict, Tuple, Optional
+
+# three levels of presence / importance and promotion: absent -> present -> correct
+LETTER_STATE_RANK = {"unused": 0, "absent": 1, "present": 2, "correct": 3}
+
+# feedback is a string with one code per letter (e.g. "GYXXG"), these are the states they stand for
+STATE_NAME = {"G": "correct", "Y": "present", "X": "absent"}
 
 class WordleGame:
     MAX_TURNS = 6
     MAX_WORD_LEN = 5
 
-    def __init__(self, target_word: str, valid_words: Set[str]):
+    def __init__(self, target_word: str, valid_words: AbstractSet[str]):
+        """
+        Args:
+            target_word (str): The secret word, in any case.
+            valid_words (AbstractSet[str]): The guess-able words, in any case. A frozenset
+                that already holds the uppercase target (like the one WordleEnv loads) is
+                shared as is, anything else is copied into an uppercase frozenset.
+        """
         if len(target_word) != self.MAX_WORD_LEN:
             raise ValueError(f"Target word must be {self.MAX_WORD_LEN} letters long.")
         if not valid_words:
@@ -13,30 +26,48 @@ class WordleGame:
 
         self.target_word = target_word.upper()
 
-        # set of all guess-able words
-        self.valid_words = {word.upper() for word in valid_words}
-        if self.target_word not in self.valid_words:
-            self.valid_words.add(self.target_word)
+        # immutable set of all guess-able (uppercase) words. a frozenset (like the one WordleEnv
+        # loads) is shared with the caller instead of copied when it holds the uppercase target,
+        # which cheaply tells an uppercase set from a lowercase one. anything else is frozen and
+        # uppercased once here so the caller can't change it mid-game
+        if isinstance(valid_words, frozenset) and self.target_word in valid_words:
+            self.valid_words: FrozenSet[str] = valid_words
+        else:
+            # the target is always guess-able
+            self.valid_words = frozenset(word.upper() for word in valid_words) | {self.target_word}
+
+        # letter counts of the target, computed once per game so feedback only copies
+        # this small dict instead of building a Counter per guess. keyed by character,
+        # so words with non A-Z characters (digits, accents, ...) work too
+        self._target_counts: Dict[str, int] = dict(Counter(self.target_word))
 
         # game state vars tracked throughout the game
         self.guesses: List[str] = []
-        self.feedbacks: List[List[str]] = []
+        self.feedbacks: List[str] = []
         self.is_over = False
         self.won = False
 
+        # letter -> state mapping, updated as guesses come in rather than rebuilt from all feedback
+        self._letter_states: Dict[str, str] = {letter: "unused" for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+        # copy of _letter_states handed out by get_letter_states, made once per turn
+        self._letter_states_cache: Optional[Dict[str, str]] = None
+
+        # rendered text observations keyed by (turn, status), see get/set_cached_observation
+        self._text_obs_cache: Dict[Tuple[int, Optional[str]], str] = {}
+
     @property
     def turn(self) -> int:
         return len(self.guesses)
 
-    def guess(self, word: str) -> Tuple[str, Optional[List[str]]]:
+    def guess(self, word: str) -> Tuple[str, Optional[str]]:
         """
         Processes a guess. If the guess is invalid (wrong length or not in the
         word list), it returns a status message without consuming a turn.
         Otherwise, it updates the game state and returns feedback.
 
         Returns:
-            Tuple[str, Optional[List[str]]]: A tuple containing the status message
-            and the letter-level feedback for the guess.
+            Tuple[str, Optional[str]]: A tuple containing the status message
+            and the letter-level feedback code string for the guess (see STATE_NAME).
         """
         if self.is_over:
             return "Game is over.", None
@@ -54,6 +85,11 @@ class WordleGame:
         self.guesses.append(guess_word)
         feedback = self._compute_feedback(guess_word)
         self.feedbacks.append(feedback)
+        self._update_letter_states(guess_word, feedback)
+        self._letter_states_cache = None
+        # the cache keys include the turn, so older entries are never hit again.
+        # clearing them only keeps the cache from growing over the game
+        self._text_obs_cache.clear()
 
         # if guess is correct, we end the game
         if guess_word == self.target_word:
@@ -69,76 +105,66 @@ class WordleGame:
         # the guess was valid and we haven't reached the turn limit, so return feedback
         return "Valid guess.", feedback
 
-    def _compute_feedback(self, guess: str) -> List[str]:
+    def _compute_feedback(self, guess: str) -> str:
         """
-        Returns a list of letter-level ('correct', 'present', 'absent') feedback for a guess 
+        Returns the letter-level feedback for a guess as a string of 'G' (correct),
+        'Y' (present) and 'X' (absent) codes
         """
+        # bind the word length and the code bytes to locals for the loops below
+        word_len = self.MAX_WORD_LEN
+        correct, present, absent = b"GYX"
+
         # default all letters to absent
-        states = ['absent'] * self.MAX_WORD_LEN
+        states = bytearray(b"X" * word_len)
 
-        # make a mapping from letters in the target word to their count
-        letter_count = Counter(self.target_word)
+        # a fresh copy of the target's letter counts
+        letter_count = self._target_counts.copy()
+        target = self.target_word
         
         # check for exact matches across the 5 guessed letters
-        for i in range(self.MAX_WORD_LEN):
-            if guess[i] == self.target_word[i]:
-                states[i] = 'correct'
+        for i in range(word_len):
+            if guess[i] == target[i]:
+                states[i] = correct
                 # decrement the count of this letter in the target (so we don't count as present later)
                 letter_count[guess[i]] -= 1 
         
         # check for present letters across the 5 guessed letters
-        for i in range(self.MAX_WORD_LEN):
+        for i in range(word_len):
             # check if absent so we exclude correct matches
-            if states[i] == 'absent' and letter_count.get(guess[i], 0) > 0:
-                states[i] = 'present'
+            if states[i] == absent and letter_count.get(guess[i], 0) > 0:
+                states[i] = present
                 # decrement the count of this letter in the target (so we don't count as present if guessed more times than appears)
                 letter_count[guess[i]] -= 1
-        return states
+        return states.decode()
 
-    def get_letter_states(self) -> Dict[str, str]:
+    def _update_letter_states(self, guess: str, feedback: str):
         """
-        Returns a mapping from letters to their game state (correct, present, absent, unused)
+        Promotes the state of each guessed letter if its new feedback ranks higher
         """
-        # three levels of presence / importance and promotion: absent -> present -> correct
-        correct, present, absent = set(), set(), set()
-        
-        # iterate over feedback for each letter in all guesses
-        for guess, feedback in zip(self.guesses, self.feedbacks):
-            for i, letter in enumerate(guess):
-                # there should never be a space... but just in case
-                if letter.isspace():
-                    continue
-                
-                # if the letter is correct, add to correct set and remove from all other sets
-                if feedback[i] == 'correct':
-                    correct.add(letter)
-                    # and also remove from present set (move to a stronger presence set)
-                    if letter in present: present.remove(letter)
-
-                # if the letter is present, and not already in 'correct' set (which holds highest priority)
-                elif feedback[i] == 'present' and letter not in correct:
-                    present.add(letter) 
-
-                # if the letter is absent, add to absent set and remove from unused set
-                elif letter not in correct and letter not in present:
-                    absent.add(letter)
-
-        # i like this way better, but the generate_html() function wants mappings from letter -> state
-        # unused = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ") - correct - present - absent
-        # return {
-        #     "correct": sorted(correct),
-        #     "present": sorted(present),
-        #     "absent": sorted(absent),
-        #     "unused": sorted(unused)
-        # }
-    
-        # create a mapping letter -> state
-        return {
-            letter: (
-                "correct" if letter in correct else
-                "present" if letter in present else
-                "absent" if letter in absent else
-                "unused"
-            ) for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-        } 
+        for letter, code in zip(guess, feedback):
+            state = STATE_NAME[code]
+            # only A-Z are tracked (there should never be a space or symbol... but just in case)
+            current = self._letter_states.get(letter)
+            if current is not None and LETTER_STATE_RANK[state] > LETTER_STATE_RANK[current]:
+                self._letter_states[letter] = state
+
+    def get_cached_observation(self, status: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the text observation cached for the current turn and status, or None
+        """
+        return self._text_obs_cache.get((self.turn, status))
+
+    def set_cached_observation(self, text: str, status: Optional[str] = None):
+        """
+        Caches a rendered text observation for the current turn and status
+        """
+        self._text_obs_cache[(self.turn, status)] = text
 
+    def get_letter_states(self) -> Dict[str, str]:
+        """
+        Returns a mapping from letters to their game state (correct, present, absent, unused).
+        The same dict is returned until the next valid guess, so callers shouldn't modify it.
+        """
+        if self._letter_states_cache is None:
+            self._letter_states_cache = dict(self._letter_states)
+        return self._letter_states_cache
@@ -1,20 +1,69 @@
+import functools
 import os
+import tempfile
+import threading
 from html import escape
+from io import BytesIO
 from pathlib import Path
-from typing import Optional, List, TYPE_CHECKING
+from typing import Optional, List, Dict, Tuple, TYPE_CHECKING
 
 # Use a forward reference for the type hint to avoid circular imports
 # This is the correct way to handle type hints for classes that would cause a circular dependency.
 if TYPE_CHECKING:
     from .game import WordleGame
 
+from .game import STATE_NAME
+
 # --- Constants and Paths ---
 ASSETS_DIR = Path(__file__).parent / 'assets'
 TEMPLATE_PATH = ASSETS_DIR / 'template.html'
 CSS_PATH = ASSETS_DIR / 'styles.css'
-SCREENSHOTS_DIR = Path(__file__).parent.parent / 'logs' # Base directory for logs
+
+# the html assets never change, so they're read once at import
+try:
+    _HTML_TEMPLATE = TEMPLATE_PATH.read_text()
+    _CSS = CSS_PATH.read_text()
+except OSError:
+    # only the html renderer needs them, it re-reads (and fails) on use instead of at import
+    _HTML_TEMPLATE = _CSS = None
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+KEYBOARD_ROWS = ["QWERTYUIOP", "ASDFGHJKL", "ZXCVBNM"]
+
+# --- Image layout (mirrors styles.css at the 500x840 screenshot size) ---
+IMAGE_SIZE = (500, 840)
+COLORS = {
+    "correct": "#6aaa64",
+    "present": "#c9b458",
+    "absent": "#787c7e",
+    "empty_border": "#d3d6da",
+    "filled_border": "#878a8c",
+    "key": "#d3d6da",
+    "status_background": "#f8d7da",
+    "status_border": "#f5c6cb",
+    "status_text": "#721c24",
+}
+FONT_NAMES = ["DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf"]
+TILE_SIZE, TILE_GAP, TILE_BORDER = 62, 5, 2
+KEY_WIDTH, WIDE_KEY_WIDTH, KEY_HEIGHT, KEY_GAP, KEY_ROW_GAP = 43, 65, 58, 6, 8
+CONTENT_TOP = 100 # below the header and instructions
+STATUS_HEIGHT = 39
+STATUS_MARGIN = 10 # space above and below the status box
+GRID_PADDING = 10
+KEYBOARD_MARGIN = 40 # game-container gap + keyboard margin-top
 
 # --- Text-based UI Class ---
+@functools.lru_cache(maxsize=None)
+def _board_template(max_turns: int) -> Tuple[str, ...]:
+    """The lines of an empty text board with max_turns rows."""
+    lines = ["======="]
+    for i in range(max_turns):
+        lines += ["|     |", "|     |"]
+        if i < max_turns - 1:
+            lines.append("-------")
+    lines.append("=======")
+    return tuple(lines)
+
 class TextUI:
     def __init__(self):
         self.feedback_char_map = {"correct": "G", "present": "Y", "absent": "X"}
@@ -33,6 +82,11 @@ class TextUI:
         return input(prompt).strip().upper()
     
     def get_text_observation(self, game: 'WordleGame', status: Optional[str] = None) -> str:
+        # the same board is observed several times per step (before and after a guess, invalid retries)
+        cached = game.get_cached_observation(status)
+        if cached is not None:
+            return cached
+
         board_str = self._get_board_string(game)
         letters_str = self._get_letters_string(game)
         
@@ -41,7 +95,9 @@ class TextUI:
             clean_status = status.replace("Invalid: ", "").replace("'", "")
             status_message = f"Invalid Guess: {clean_status}\n\n"
             
-        return f"{status_message}{board_str}\n{letters_str}"
+        text_obs = f"{status_message}{board_str}\n{letters_str}"
+        game.set_cached_observation(text_obs, status)
+        return text_obs
 
     def print_game_over(self, game: 'WordleGame', model_name: str):
         print("\n" + "="*50)
@@ -52,47 +108,71 @@ class TextUI:
         print("="*50)
 
     def _get_board_string(self, game: 'WordleGame') -> str:
-        lines = ["======="]
-        # board will have at most MAX_TURNS rows
-        for i in range(game.MAX_TURNS):
-            # 
-            if i < game.turn:
-                word = game.guesses[i].upper()
-                feedback = game.feedbacks[i]
-                feedback_chars = "".join([self.feedback_char_map.get(f, "?") for f in feedback])
-                lines.append(f"|{word}|")
-                lines.append(f"|{feedback_chars}|")
-            else:
-                lines.append("|     |")
-                lines.append("|     |")
-            
-            if i < game.MAX_TURNS - 1:
-                lines.append("-------")
-        lines.append("=======")
+        # start from the empty board and overwrite the two lines of each played turn.
+        # turn i's word sits at line 1 + 3*i and its feedback right below it
+        lines = list(_board_template(game.MAX_TURNS))
+        guesses, feedbacks = game.guesses, game.feedbacks
+        for i in range(game.turn):
+            lines[1 + 3 * i] = f"|{guesses[i].upper()}|"
+            lines[2 + 3 * i] = f"|{feedbacks[i]}|"
         return "\n".join(lines)
 
     def _get_letters_string(self, game: 'WordleGame') -> str:
         # get the state of all letters
         letter_states = game.get_letter_states()
         
-        # unpack dict and list letters in alphabetical order
-        correct = sorted([k for k, v in letter_states.items() if v == "correct"])
-        present = sorted([k for k, v in letter_states.items() if v == "present"])
-        absent = sorted([k for k, v in letter_states.items() if v == "absent"])
-        unused = sorted([k for k, v in letter_states.items() if v == "unused"])
+        # bucket the letters by state in one pass. going through them A-Z
+        # means every bucket is already in alphabetical order
+        buckets: Dict[str, List[str]] = {"correct": [], "present": [], "absent": [], "unused": []}
+        for letter in ALPHABET:
+            buckets[letter_states[letter]].append(letter)
 
         # build the string
         lines = ["\nLetters:"]
-        lines.append(f"  Correct: {' '.join(correct)}")
-        lines.append(f"  Present: {' '.join(present)}")
-        lines.append(f"  Absent:  {' '.join(absent)}")
-        lines.append(f"  Unused:  {' '.join(unused)}")
+        lines.append(f"  Correct: {' '.join(buckets['correct'])}")
+        lines.append(f"  Present: {' '.join(buckets['present'])}")
+        lines.append(f"  Absent:  {' '.join(buckets['absent'])}")
+        lines.append(f"  Unused:  {' '.join(buckets['unused'])}")
         return "\n".join(lines)
 
 
 # --- Screenshot and HTML generation ---
+# markup that doesn't depend on the game, filled in with str.format where needed
+_TILE = {code: f'<div class="tile {state} filled">{{}}</div>' for code, state in STATE_NAME.items()}
+_EMPTY_TILE = '<div class="tile"></div>'
+_ROW = '<div class="row">{}</div>'
+_KEYBOARD_ROW_START = {
+    row: '<div class="keyboard-row">' + ('<button class="key wide">Enter</button>' if 'Z' in row else '')
+    for row in KEYBOARD_ROWS
+}
+_KEYBOARD_ROW_END = {
+    row: ('<button class="key wide">⌫</button>' if 'M' in row else '') + '</div>'
+    for row in KEYBOARD_ROWS
+}
+
+HTI_FLAGS = ['--disable-gpu', '--no-sandbox', '--headless=new', '--log-level=3']
+_temp_dir: Optional[str] = None
+
+# one Html2Image instance shared by every screenshot. its output directory is switched per
+# call, so the lock keeps parallel envs from writing into each other's directories
+_HTI = None
+_HTI_LOCK = threading.Lock()
+
+def _get_temp_dir() -> str:
+    """Returns this process's scratch directory for unsaved screenshots, creating it on first use."""
+    global _temp_dir
+    if _temp_dir is None:
+        _temp_dir = tempfile.mkdtemp(prefix="wordle-screenshots-")
+    return _temp_dir
+
+@functools.lru_cache(maxsize=None)
+def _empty_board_rows(max_turns: int, word_len: int) -> Tuple[str, ...]:
+    """The row markup of an empty HTML board."""
+    return (_ROW.format(_EMPTY_TILE * word_len),) * max_turns
+
 def generate_html(game: 'WordleGame', status: Optional[str] = None, invalid_guess: Optional[str] = None) -> str:
     guesses, feedbacks = game.guesses, game.feedbacks
+    max_turns, word_len, turn = game.MAX_TURNS, game.MAX_WORD_LEN, game.turn
     letter_states = game.get_letter_states()
     
     message_html = ''
@@ -100,43 +180,40 @@ def generate_html(game: 'WordleGame', status: Optional[str] = None, invalid_gues
         clean_status = status.replace("Invalid: ", "")
         message_html = f'<div class="status-message">{escape(clean_status)}</div>'
 
-    grid_html = ''
-    for r in range(game.MAX_TURNS):
-        grid_html += '<div class="row">'
-        if r < len(guesses):
-            for c in range(game.MAX_WORD_LEN):
-                grid_html += f'<div class="tile {feedbacks[r][c]} filled">{escape(guesses[r][c])}</div>'
-        elif r == game.turn and invalid_guess:
-            for char in invalid_guess:
-                grid_html += f'<div class="tile absent filled">{escape(char)}</div>'
-            for _ in range(game.MAX_WORD_LEN - len(invalid_guess)):
-                grid_html += '<div class="tile"></div>'
-        else:
-            for _ in range(game.MAX_WORD_LEN): grid_html += '<div class="tile"></div>'
-        grid_html += '</div>'
-    
-    keyboard_html = ''
-    for row in ["QWERTYUIOP", "ASDFGHJKL", "ZXCVBNM"]:
-        keyboard_html += '<div class="keyboard-row">'
-        if 'Z' in row: keyboard_html += '<button class="key wide">Enter</button>'
+    # start from the empty board and only build markup for the rows that have letters
+    rows = list(_empty_board_rows(max_turns, word_len))
+    for r in range(turn):
+        # played guesses are words from the word list, so there's nothing to escape
+        rows[r] = _ROW.format("".join([_TILE[code].format(char) for code, char in zip(feedbacks[r], guesses[r])]))
+    if invalid_guess and turn < max_turns:
+        # invalid guesses are raw model output and may contain markup
+        tiles = [_TILE["X"].format(escape(char)) for char in invalid_guess]
+        tiles.extend([_EMPTY_TILE] * (word_len - len(invalid_guess)))
+        rows[turn] = _ROW.format("".join(tiles))
+    grid_html = "".join(rows)
+
+    keyboard_parts: List[str] = []
+    for row in KEYBOARD_ROWS:
+        keyboard_parts.append(_KEYBOARD_ROW_START[row])
         for key in row:
-            cls = letter_states.get(key, '')
-            keyboard_html += f'<button class="key {cls}">{key}</button>'
-        if 'M' in row: keyboard_html += '<button class="key wide">⌫</button>'
-        keyboard_html += '</div>'
+            keyboard_parts.append(f'<button class="key {letter_states.get(key, "")}">{key}</button>')
+        keyboard_parts.append(_KEYBOARD_ROW_END[row])
+    keyboard_html = "".join(keyboard_parts)
 
-    with open(TEMPLATE_PATH, 'r') as f: html_template = f.read()
+    html_template = _HTML_TEMPLATE if _HTML_TEMPLATE is not None else TEMPLATE_PATH.read_text()
     return html_template.format(grid_html=grid_html, keyboard_html=keyboard_html, message_html=message_html)
 
 
-def render_wordle_screenshot(
+def render_wordle_screenshot_html(
     game: 'WordleGame',
     status: Optional[str] = None,
     invalid_guess: Optional[str] = None,
     output_path: Optional[Path] = None
 ) -> Optional[bytes]:
     """
-    Renders the game state as an image and returns its bytes.
+    Renders the game state as an image by screenshotting the HTML page in a
+    headless browser, and returns its bytes. Much slower than
+    render_wordle_screenshot, but kept for the 'image_html' render mode.
     If output_path is provided, it saves the image to that path as a side effect.
     """
     try:
@@ -146,26 +223,186 @@ def render_wordle_screenshot(
         return None
 
     html = generate_html(game, status, invalid_guess)
-    with open(CSS_PATH, 'r') as f:
-        css = f.read()
+    css = _CSS if _CSS is not None else CSS_PATH.read_text()
 
-    temp_dir = SCREENSHOTS_DIR / ".temp"
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    hti = Html2Image(custom_flags=['--disable-gpu', '--no-sandbox', '--headless=new', '--log-level=3'], output_path=temp_dir)
-    
-    temp_files: List[str] = hti.screenshot(html_str=html, css_str=css, size=(500, 840))
-    if not temp_files:
-        return None
+    global _HTI
+    with _HTI_LOCK:
+        if _HTI is None:
+            _HTI = Html2Image(custom_flags=HTI_FLAGS, output_path=_get_temp_dir())
+
+        # screenshots that are saved are written straight to their destination, the rest go
+        # to a scratch directory that is created once per process
+        if output_path:
+            os.makedirs(output_path.parent, exist_ok=True)
+            _HTI.output_path = str(output_path.parent)
+            screenshot_files: List[str] = _HTI.screenshot(html_str=html, css_str=css, save_as=output_path.name, size=IMAGE_SIZE)
+        else:
+            _HTI.output_path = _get_temp_dir()
+            screenshot_files = _HTI.screenshot(html_str=html, css_str=css, size=IMAGE_SIZE)
+        if not screenshot_files:
+            return None
+
+        screenshot_path = Path(screenshot_files[0])
+        image_bytes = screenshot_path.read_bytes()
+        if not output_path:
+            screenshot_path.unlink()
+
+    return image_bytes
+
+
+# --- In-process image rendering ---
+class _Renderer:
+    """
+    Draws the Wordle page with Pillow. The fonts, the static header and every
+    tile and key sprite are built once, so a frame is mostly pastes.
+    """
+    def __init__(self):
+        from PIL import Image, ImageDraw, ImageFont
+        self.Image, self.ImageDraw = Image, ImageDraw
+        self.fonts = {size: self._load_font(ImageFont, size) for size in (14, 16, 20, 32, 36)}
+        self.tiles = {}
+        self.keys = {}
+        self.base = self._draw_base()
+
+    @staticmethod
+    def _load_font(ImageFont, size: int):
+        for name in FONT_NAMES:
+            try:
+                return ImageFont.truetype(name, size)
+            except OSError:
+                continue
+        return ImageFont.load_default(size=size)
+
+    def _draw_base(self):
+        # the header and instructions never change
+        img = self.Image.new("RGB", IMAGE_SIZE, "#ffffff")
+        draw = self.ImageDraw.Draw(img)
+        center_x = IMAGE_SIZE[0] // 2
+
+        # title, drawn letter by letter to reproduce the css letter-spacing
+        title_font, spacing = self.fonts[36], 3
+        widths = [title_font.getlength(char) for char in "WORDLE"]
+        x = center_x - (sum(widths) + spacing * (len(widths) - 1)) / 2
+        for char, width in zip("WORDLE", widths):
+            draw.text((x, 41), char, font=title_font, fill="#000000", anchor="lm")
+            x += width + spacing
+
+        # help button on the right edge of the header
+        draw.ellipse((440, 26, 480, 66), outline=COLORS["empty_border"], width=2, fill="#ffffff")
+        draw.text((460, 46), "?", font=self.fonts[20], fill="#000000", anchor="mm")
+
+        draw.text((center_x, 82), "Guess the 5-letter word in 6 tries", font=self.fonts[14], fill="#000000", anchor="mm")
+        return img
+
+    def tile(self, state: Optional[str], letter: str = ""):
+        """Returns the cached tile sprite for a feedback state ('filled' for a plain letter, None for empty)."""
+        key = (state, letter)
+        sprite = self.tiles.get(key)
+        if sprite is None:
+            if state in ("correct", "present", "absent"):
+                background, border, text_color = COLORS[state], COLORS[state], "#ffffff"
+            else:
+                background, text_color = "#ffffff", "#000000"
+                border = COLORS["filled_border"] if state == "filled" else COLORS["empty_border"]
+            sprite = self.Image.new("RGB", (TILE_SIZE, TILE_SIZE), border)
+            draw = self.ImageDraw.Draw(sprite)
+            draw.rectangle((TILE_BORDER, TILE_BORDER, TILE_SIZE - TILE_BORDER - 1, TILE_SIZE - TILE_BORDER - 1), fill=background)
+            if letter:
+                draw.text((TILE_SIZE / 2, TILE_SIZE / 2), letter, font=self.fonts[32], fill=text_color, anchor="mm")
+            self.tiles[key] = sprite
+        return sprite
+
+    def key(self, label: str, state: Optional[str]):
+        """Returns the cached keyboard key sprite for a label and letter state."""
+        cache_key = (label, state)
+        sprite = self.keys.get(cache_key)
+        if sprite is None:
+            wide = len(label) > 1 or label == "⌫"
+            width = WIDE_KEY_WIDTH if wide else KEY_WIDTH
+            background = COLORS.get(state, COLORS["key"])
+            text_color = "#ffffff" if state in ("correct", "present", "absent") else "#000000"
+            # keys are drawn on the page background so the rounded corners blend in
+            sprite = self.Image.new("RGB", (width, KEY_HEIGHT), "#ffffff")
+            draw = self.ImageDraw.Draw(sprite)
+            draw.rounded_rectangle((0, 0, width - 1, KEY_HEIGHT - 1), radius=4, fill=background)
+            draw.text((width / 2, KEY_HEIGHT / 2), label, font=self.fonts[14 if wide else 16], fill=text_color, anchor="mm")
+            self.keys[cache_key] = sprite
+        return sprite
+
+    def render(self, game: 'WordleGame', status: Optional[str], invalid_guess: Optional[str]):
+        img = self.base.copy()
+        center_x = IMAGE_SIZE[0] // 2
+        top = CONTENT_TOP
+
+        if status and "Invalid:" in status:
+            draw = self.ImageDraw.Draw(img)
+            box = (20, top + STATUS_MARGIN, IMAGE_SIZE[0] - 20, top + STATUS_MARGIN + STATUS_HEIGHT)
+            draw.rounded_rectangle(box, radius=4, fill=COLORS["status_background"], outline=COLORS["status_border"])
+            draw.text((center_x, top + STATUS_MARGIN + STATUS_HEIGHT / 2), status.replace("Invalid: ", ""),
+                      font=self.fonts[14], fill=COLORS["status_text"], anchor="mm")
+            top += STATUS_MARGIN + STATUS_HEIGHT + STATUS_MARGIN
+
+        # --- grid ---
+        max_turns, word_len, turn = game.MAX_TURNS, game.MAX_WORD_LEN, game.turn
+        grid_left = center_x - (word_len * TILE_SIZE + (word_len - 1) * TILE_GAP) // 2
+        y = top + GRID_PADDING
+        guesses, feedbacks = game.guesses, game.feedbacks
+        for r in range(max_turns):
+            if r < turn:
+                tiles = [self.tile(STATE_NAME[code], char) for char, code in zip(guesses[r], feedbacks[r])]
+            elif r == turn and invalid_guess:
+                tiles = [self.tile("absent", char) for char in invalid_guess[:word_len].upper()]
+            else:
+                tiles = []
+            tiles += [self.tile(None)] * (word_len - len(tiles))
+            for c, tile in enumerate(tiles):
+                img.paste(tile, (grid_left + c * (TILE_SIZE + TILE_GAP), y))
+            y += TILE_SIZE + TILE_GAP
+
+        # --- keyboard ---
+        letter_states = game.get_letter_states()
+        y = top + GRID_PADDING * 2 + max_turns * TILE_SIZE + (max_turns - 1) * TILE_GAP + KEYBOARD_MARGIN
+        for row in KEYBOARD_ROWS:
+            keys = [self.key(char, letter_states.get(char)) for char in row]
+            if 'Z' in row:
+                keys = [self.key("Enter", None)] + keys + [self.key("⌫", None)]
+            x = center_x - (sum(key.width for key in keys) + KEY_GAP * (len(keys) - 1)) // 2
+            for key in keys:
+                img.paste(key, (x, y))
+                x += key.width + KEY_GAP
+            y += KEY_HEIGHT + KEY_ROW_GAP
+
+        return img
+
+_renderer: Optional[_Renderer] = None
+
+def render_wordle_screenshot(
+    game: 'WordleGame',
+    status: Optional[str] = None,
+    invalid_guess: Optional[str] = None,
+    output_path: Optional[Path] = None
+) -> Optional[bytes]:
+    """
+    Renders the game state as a PNG image with Pillow and returns its bytes.
+    If output_path is provided, it saves the image to that path as a side effect.
+    """
+    global _renderer
+    if _renderer is None:
+        try:
+            _renderer = _Renderer()
+        except ImportError:
+            print("\n[ERROR] Pillow is not installed. To render images, run: 'pip install Pillow'")
+            return None
 
-    temp_file_path = Path(temp_files[0])
-    with open(temp_file_path, 'rb') as f:
-        image_bytes = f.read()
+    img = _renderer.render(game, status, invalid_guess)
+    # favour speed over file size, the image is re-encoded as base64 right away anyway
+    buffer = BytesIO()
+    img.save(buffer, format="PNG", optimize=False, compress_level=1)
+    image_bytes = buffer.getvalue()
 
     if output_path:
         os.makedirs(output_path.parent, exist_ok=True)
-        temp_file_path.rename(output_path)
-    else:
-        os.remove(temp_file_path)
+        with open(output_path, 'wb') as f:
+            f.write(image_bytes)
 
-    return image_bytes
\ No newline at end of file
+    return image_bytes